@@ -0,0 +1,77 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from scoring_backend import API_URL, MODEL_DIR, load_embedded_model, predict_embedded, predict_http
+
+# ==============================================================================
+# BENCHMARK : LATENCE PAR INTERACTION (HTTP vs EMBARQUÉ)
+# ==============================================================================
+# Une "interaction" = le scoring d'un dossier, tel que le fait le dashboard
+# (sélection d'un client ou clic sur "Calculer le Score").
+#
+# Usage : python bench_scoring_backends.py --n 50 [--skip-http]
+
+COLS_EXCLUDED = ['TARGET', 'SK_ID_CURR', 'index', 'Unnamed: 0']
+
+
+def load_records(data_file, n):
+    df = pd.read_csv(data_file).head(n)
+    df = df.drop(columns=[c for c in COLS_EXCLUDED if c in df.columns]).fillna(0)
+    return df.to_dict(orient="records")
+
+
+def time_calls(score_one, records):
+    """Latence (ms) de chaque appel, un dossier à la fois"""
+    latencies = []
+    for rec in records:
+        start = time.perf_counter()
+        score_one(rec)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def summary(name, latencies):
+    return {
+        "Mode": name,
+        "Appels": len(latencies),
+        "Moyenne (ms)": latencies.mean(),
+        "p50 (ms)": np.percentile(latencies, 50),
+        "p95 (ms)": np.percentile(latencies, 95),
+        "Max (ms)": latencies.max(),
+    }
+
+
+def http_call(rec, url):
+    response = predict_http([rec], url=url)
+    response.raise_for_status()
+    return response.json()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare la latence de scoring HTTP vs embarqué.")
+    parser.add_argument("--data", default="donnees_sample.csv")
+    parser.add_argument("--n", type=int, default=50, help="Nombre d'interactions simulées")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--skip-http", action="store_true", help="Mesure hors-ligne (mode embarqué seul)")
+    args = parser.parse_args()
+
+    records = load_records(args.data, args.n)
+    rows = []
+
+    # 1. Mode embarqué : chargement unique (équivalent st.cache_resource), puis appels directs
+    start = time.perf_counter()
+    model = load_embedded_model(args.model_dir)
+    print(f"Chargement du modèle embarqué : {(time.perf_counter() - start) * 1000:.0f} ms (une seule fois)")
+    rows.append(summary("embedded", time_calls(lambda rec: predict_embedded(model, [rec]), records)))
+
+    # 2. Mode HTTP : le premier appel inclut l'éventuel démarrage à froid de l'API
+    if not args.skip_http:
+        start = time.perf_counter()
+        http_call(records[0], args.url)
+        print(f"Premier appel HTTP (démarrage à froid éventuel) : {(time.perf_counter() - start) * 1000:.0f} ms")
+        rows.append(summary("http", time_calls(lambda rec: http_call(rec, args.url), records)))
+
+    print("\n" + pd.DataFrame(rows).to_string(index=False, float_format="%.1f"))
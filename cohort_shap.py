@@ -0,0 +1,354 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+# Seuil métier : probabilité de défaut au-delà de laquelle le crédit est refusé
+SEUIL_RISQUE = 0.067
+
+# Fichier de stockage de la matrice SHAP N x F (float32)
+SHAP_MATRIX_FILE = "shap_matrix.npz"
+
+# Préfixes des variables one-hot utilisées comme segments de cohorte
+SEGMENT_PREFIXES = [
+    "ORGANIZATION_TYPE_",
+    "NAME_FAMILY_STATUS_",
+    "NAME_INCOME_TYPE_",
+    "NAME_EDUCATION_TYPE_",
+    "NAME_CONTRACT_TYPE_",
+    "OCCUPATION_TYPE_",
+]
+
+COLS_TECHNIQUES = ['SK_ID_CURR', 'TARGET', 'index', 'Unnamed: 0']
+
+# ==============================================================================
+# CALCUL DE LA MATRICE SHAP (PAR LOTS)
+# ==============================================================================
+
+def extraire_shap_positif(shap_values):
+    """Renvoie les SHAP values de la classe positive (liste vs array selon la version de SHAP)."""
+    if isinstance(shap_values, list):
+        return np.asarray(shap_values[1])
+    shap_values = np.asarray(shap_values)
+    # Certaines versions renvoient un tableau (N, F, 2)
+    if shap_values.ndim == 3:
+        return shap_values[:, :, 1]
+    return shap_values
+
+
+def split_pipeline(pipeline):
+    """
+    Sépare le Pipeline en (classifieur, préprocesseur) : SHAP TreeExplainer
+    n'accepte que le modèle final, qui attend des données déjà transformées.
+    """
+    if hasattr(pipeline, 'steps'):
+        # Le modèle est la dernière étape, le préprocesseur tout ce qui précède
+        return pipeline.steps[-1][1], pipeline[:-1]
+    return pipeline, None
+
+
+def compute_shap_matrix(explainer, X, preprocessor=None, chunk_size=2000):
+    """
+    Calcule la matrice SHAP N x F (float32) par lots de `chunk_size` lignes,
+    avec l'explainer existant (et le préprocesseur du pipeline si présent).
+    """
+    n = len(X)
+    matrix = None
+
+    for start in range(0, n, chunk_size):
+        chunk = X.iloc[start:start + chunk_size]
+        if preprocessor is not None:
+            chunk = preprocessor.transform(chunk)
+
+        vals = extraire_shap_positif(explainer.shap_values(chunk))
+
+        # Allocation unique au premier lot (on connaît alors le nombre de features)
+        if matrix is None:
+            matrix = np.empty((n, vals.shape[1]), dtype=np.float32)
+        matrix[start:start + len(vals)] = vals
+
+    if matrix is None:
+        matrix = np.empty((0, X.shape[1]), dtype=np.float32)
+    return matrix
+
+
+def segment_columns(columns, prefixes=SEGMENT_PREFIXES):
+    """Liste des colonnes one-hot correspondant aux préfixes de segment."""
+    return [c for c in columns if any(c.startswith(p) for p in prefixes)]
+
+# ==============================================================================
+# STOCKAGE + AGRÉGATION PAR SEGMENT
+# ==============================================================================
+
+class CohortShapStore:
+    """
+    Matrice SHAP stockée (N x F, float32) avec les scores et l'appartenance
+    aux segments (N x S, booléen).
+
+    Les agrégats par segment (somme |SHAP|, somme SHAP signée, effectif,
+    nombre de refus) sont maintenus en continu : un nouveau client scoré
+    ne coûte qu'une mise à jour des sommes, sans recalcul sur toute la matrice.
+
+    Le stockage est un buffer préalloué dont la capacité double quand il est
+    plein : l'ajout d'un client coûte O(F) (amorti), pas une copie de la matrice.
+
+    Le store est partagé entre threads (threadpool FastAPI, sessions Streamlit) :
+    mises à jour et lectures passent par un verrou. Les mises à jour restent
+    en mémoire tant que `save()` n'est pas appelé (perdues au redémarrage sinon).
+    """
+
+    def __init__(self, ids, shap_matrix, scores, membership, feature_names,
+                 segment_names, threshold=SEUIL_RISQUE):
+        self._ids_buf = np.asarray(ids)
+        self._shap_buf = np.asarray(shap_matrix, dtype=np.float32)
+        self._scores_buf = np.asarray(scores, dtype=np.float32)
+        self._membership_buf = np.asarray(membership, dtype=bool)
+        self._n = len(self._ids_buf)
+        self.feature_names = list(feature_names)
+        self.segment_names = list(segment_names)
+        self.threshold = threshold
+        # Incrémenté à chaque mise à jour (clé de cache des vues de cohorte)
+        self.version = 0
+        self._lock = threading.RLock()
+
+        self._index = {k: i for i, k in enumerate(self.ids.tolist())}
+        self._recompute()
+
+    # --- Buffers (vues sur les N lignes utilisées) ---
+
+    @property
+    def ids(self):
+        return self._ids_buf[:self._n]
+
+    @property
+    def shap(self):
+        return self._shap_buf[:self._n]
+
+    @property
+    def scores(self):
+        return self._scores_buf[:self._n]
+
+    @property
+    def membership(self):
+        return self._membership_buf[:self._n]
+
+    def _reserve(self, n_new):
+        """Garantit la place pour n_new lignes (capacité doublée si nécessaire)."""
+        needed = self._n + n_new
+        capacity = len(self._ids_buf)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 16)
+
+        def grow(buf):
+            new = np.empty((capacity,) + buf.shape[1:], dtype=buf.dtype)
+            new[:self._n] = buf[:self._n]
+            return new
+
+        self._ids_buf = grow(self._ids_buf)
+        self._shap_buf = grow(self._shap_buf)
+        self._scores_buf = grow(self._scores_buf)
+        self._membership_buf = grow(self._membership_buf)
+
+    # --- Construction / persistance ---
+
+    @classmethod
+    def from_dataframe(cls, df, shap_matrix, scores, feature_names,
+                       prefixes=SEGMENT_PREFIXES, threshold=SEUIL_RISQUE):
+        """Construit le store depuis les données clients et la matrice SHAP associée."""
+        seg_cols = segment_columns(df.columns, prefixes)
+        membership = df[seg_cols].fillna(0).to_numpy() > 0.5
+        ids = df['SK_ID_CURR'].to_numpy() if 'SK_ID_CURR' in df.columns else np.arange(len(df))
+        return cls(ids, shap_matrix, scores, membership, feature_names, seg_cols, threshold)
+
+    @classmethod
+    def load(cls, path=SHAP_MATRIX_FILE):
+        data = np.load(path, allow_pickle=False)
+        return cls(
+            data['ids'], data['shap'], data['scores'], data['membership'],
+            data['feature_names'].tolist(), data['segment_names'].tolist(),
+            float(data['threshold'])
+        )
+
+    def save(self, path=SHAP_MATRIX_FILE):
+        """
+        Sauvegarde (à appeler hors du chemin des requêtes) : seule la copie de
+        l'état se fait sous verrou, la compression et l'écriture se font après.
+        Écriture atomique (fichier temporaire puis renommage). Renvoie la
+        version sauvegardée.
+        """
+        with self._lock:
+            snapshot = dict(
+                ids=self.ids.copy(), shap=self.shap.copy(), scores=self.scores.copy(),
+                membership=self.membership.copy()
+            )
+            version = self.version
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                feature_names=np.array(self.feature_names),
+                segment_names=np.array(self.segment_names),
+                threshold=np.float64(self.threshold),
+                **snapshot
+            )
+        os.replace(tmp_path, path)
+        return version
+
+    # --- Agrégats ---
+
+    def _recompute(self):
+        """Agrégats complets : un produit matriciel (S x N) @ (N x F)."""
+        m = self.membership.astype(np.float32)
+        self._sum_abs = m.T @ np.abs(self.shap)
+        self._sum_signed = m.T @ self.shap
+        self._count = self.membership.sum(axis=0).astype(np.int64)
+        self._refused = self.membership[self.scores > self.threshold].sum(axis=0).astype(np.int64)
+
+    def _accumulate(self, membership, shap_rows, scores, sign=1):
+        m = membership.astype(np.float32)
+        self._sum_abs += sign * (m.T @ np.abs(shap_rows))
+        self._sum_signed += sign * (m.T @ shap_rows)
+        self._count += sign * membership.sum(axis=0)
+        self._refused += sign * membership[scores > self.threshold].sum(axis=0)
+
+    def upsert(self, ids, shap_rows, scores, membership):
+        """
+        Ajoute (ou remplace) des clients scorés et met à jour les agrégats
+        de manière incrémentale. Un ID répété dans l'appel n'est compté
+        qu'une fois (la dernière occurrence l'emporte).
+        """
+        ids = np.asarray(ids)
+        shap_rows = np.atleast_2d(np.asarray(shap_rows, dtype=np.float32))
+        scores = np.atleast_1d(np.asarray(scores, dtype=np.float32))
+        membership = np.atleast_2d(np.asarray(membership, dtype=bool))
+
+        # Dédoublonnage intra-appel : on garde la dernière occurrence de chaque ID
+        _, last_from_end = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last_from_end)
+        if len(keep) < len(ids):
+            ids, shap_rows, scores, membership = ids[keep], shap_rows[keep], scores[keep], membership[keep]
+
+        with self._lock:
+            pos = np.array([self._index.get(k, -1) for k in ids], dtype=np.int64)
+            known = pos >= 0
+
+            # 1. Clients déjà présents : on retire l'ancienne contribution puis on écrase
+            if known.any():
+                rows = pos[known]
+                self._accumulate(self.membership[rows], self.shap[rows], self.scores[rows], sign=-1)
+                self.shap[rows] = shap_rows[known]
+                self.scores[rows] = scores[known]
+                self.membership[rows] = membership[known]
+
+            # 2. Nouveaux clients : ajout en fin de buffer (sans recopier la matrice)
+            new = ~known
+            if new.any():
+                new_ids = ids[new]
+                start = self._n
+                end = start + len(new_ids)
+                self._reserve(len(new_ids))
+                self._ids_buf[start:end] = new_ids
+                self._shap_buf[start:end] = shap_rows[new]
+                self._scores_buf[start:end] = scores[new]
+                self._membership_buf[start:end] = membership[new]
+                self._n = end
+                for i, k in enumerate(new_ids.tolist()):
+                    self._index[k] = start + i
+
+            self._accumulate(membership, shap_rows, scores, sign=1)
+            self.version += 1
+
+    def membership_from_features(self, features):
+        """Vecteur d'appartenance aux segments pour un client (dict de features)."""
+        return np.array([float(features.get(c, 0) or 0) > 0.5 for c in self.segment_names], dtype=bool)
+
+    def shap_row_from_dict(self, shap_dict):
+        """Aligne un dict {feature: shap} sur l'ordre des colonnes du store."""
+        return np.array([shap_dict.get(f, 0.0) for f in self.feature_names], dtype=np.float32)
+
+    def segments(self, prefix):
+        """Synthèse par segment d'un préfixe : effectif et taux de refus."""
+        idx = [i for i, s in enumerate(self.segment_names) if s.startswith(prefix)]
+        with self._lock:
+            count = self._count[idx].copy()
+            refused = self._refused[idx].copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            refusal = np.where(count > 0, refused / np.maximum(count, 1), np.nan)
+        return pd.DataFrame({
+            'Segment': [self.segment_names[i][len(prefix):] for i in idx],
+            'Colonne': [self.segment_names[i] for i in idx],
+            'Effectif': count,
+            'Taux_Refus': refusal,
+        }).sort_values('Effectif', ascending=False).reset_index(drop=True)
+
+    def overall_refusal_rate(self):
+        """Taux de refus sur l'ensemble des clients du store."""
+        with self._lock:
+            return float(np.mean(self.scores > self.threshold)) if len(self.scores) else float('nan')
+
+    def segment_profile(self, segment, top=15):
+        """Top variables d'un segment : moyenne |SHAP| et moyenne SHAP signée."""
+        i = self.segment_names.index(segment)
+        with self._lock:
+            n = max(int(self._count[i]), 1)
+            mean_abs = self._sum_abs[i] / n
+            mean_signed = self._sum_signed[i] / n
+        profile = pd.DataFrame({
+            'Feature': self.feature_names,
+            'Mean_Abs_SHAP': mean_abs,
+            'Mean_SHAP': mean_signed,
+        })
+        return profile.sort_values('Mean_Abs_SHAP', ascending=False).head(top).reset_index(drop=True)
+
+    def summary(self, prefix, top=15):
+        """Agrégation complète d'un préfixe (format JSON pour l'API)."""
+        out = []
+        # Verrou réentrant : la synthèse entière est lue sur un état cohérent
+        with self._lock:
+            seg_df = self.segments(prefix)
+            for _, row in seg_df.iterrows():
+                profile = self.segment_profile(row['Colonne'], top=top)
+                out.append({
+                    "segment": row['Segment'],
+                    "count": int(row['Effectif']),
+                    "refusal_rate": None if pd.isna(row['Taux_Refus']) else float(row['Taux_Refus']),
+                    "mean_abs_shap": dict(zip(profile['Feature'], profile['Mean_Abs_SHAP'].astype(float))),
+                    "mean_shap": dict(zip(profile['Feature'], profile['Mean_SHAP'].astype(float))),
+                })
+        return out
+
+# ==============================================================================
+# CONSTRUCTION HORS-LIGNE
+# ==============================================================================
+
+if __name__ == "__main__":
+    import joblib
+    import shap
+
+    MODEL_FILE = "./mlruns/9/models/m-0a84d69a2e314f0e82736c01fbcdd540/artifacts/model.pkl"
+    DATA_FILE = "donnees_sample.csv"
+
+    pipeline = joblib.load(MODEL_FILE)
+    classifier, preprocessor = split_pipeline(pipeline)
+    explainer = shap.TreeExplainer(classifier)
+
+    df = pd.read_csv(DATA_FILE)
+    X = df.drop(columns=[c for c in COLS_TECHNIQUES if c in df.columns]).fillna(0)
+    if hasattr(pipeline, "feature_names_in_"):
+        X = X.reindex(columns=pipeline.feature_names_in_, fill_value=0)
+
+    t0 = time.perf_counter()
+    scores = pipeline.predict_proba(X)[:, 1]
+    matrix = compute_shap_matrix(explainer, X, preprocessor=preprocessor)
+    print(f"Matrice SHAP {matrix.shape} calculée en {time.perf_counter() - t0:.1f}s")
+
+    store = CohortShapStore.from_dataframe(df, matrix, scores, X.columns)
+    store.save(SHAP_MATRIX_FILE)
+    print(f"✅ Matrice sauvegardée : {os.path.abspath(SHAP_MATRIX_FILE)}")
@@ -0,0 +1,66 @@
+import time
+import numpy as np
+import pytest
+
+# ==============================================================================
+# DOUBLURES DE TEST PARTAGÉES (MODÈLE, WRAPPER MLFLOW, EXPLAINER SHAP)
+# ==============================================================================
+
+class CallRecorder:
+    """Base des doublures : enregistre la taille de chaque lot reçu (délai optionnel)"""
+    def __init__(self, delay=0.0):
+        self.batch_sizes = []
+        self.delay = delay
+
+    @property
+    def calls(self):
+        return len(self.batch_sizes)
+
+    def _record(self, X):
+        self.batch_sizes.append(len(X))
+        time.sleep(self.delay)
+
+
+class FakeWrapper(CallRecorder):
+    """Remplace le CreditScoringWrapper chargé par mlflow (même format de sortie)"""
+    def predict(self, df):
+        self._record(df)
+        n = len(df)
+        return {
+            "score": [0.2] * n,
+            "decision": ["REFUSÉ"] * n,
+            "threshold": 0.067,
+            "shap_values": [[0.01] * df.shape[1] for _ in range(n)]
+        }
+
+
+class FakeModel(CallRecorder):
+    """Modèle factice : le risque baisse avec EXT_SOURCE_2 et monte avec AMT_CREDIT"""
+    def predict_proba(self, X):
+        self._record(X)
+        z = 2.0 - 8.0 * X['EXT_SOURCE_2'].to_numpy() + X['AMT_CREDIT'].to_numpy() / 100000.0
+        p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1 - p, p])
+
+
+class FakeExplainer(CallRecorder):
+    """Explainer factice : SHAP = valeurs d'entrée, au format liste [classe_0, classe_1]"""
+    def shap_values(self, X):
+        self._record(X)
+        vals = np.asarray(X, dtype=float)
+        return [-vals, vals]
+
+
+@pytest.fixture
+def fake_wrapper():
+    return FakeWrapper()
+
+
+@pytest.fixture
+def fake_model():
+    return FakeModel()
+
+
+@pytest.fixture
+def fake_explainer():
+    return FakeExplainer()
@@ -0,0 +1,201 @@
+import time
+import numpy as np
+
+from cohort_shap import SEUIL_RISQUE
+
+# ==============================================================================
+# CONFIGURATION
+# ==============================================================================
+
+# Variables actionnables (celles du formulaire de simulation du dashboard)
+# Format : feature -> (borne min, borne max, pas). None = pas de borne.
+ACTIONABLE_FEATURES = {
+    'AMT_CREDIT': (0.0, None, 5000.0),
+    'AMT_ANNUITY': (0.0, None, 500.0),
+    'AMT_GOODS_PRICE': (0.0, None, 5000.0),
+    'EXT_SOURCE_1': (0.0, 1.0, 0.01),
+    'EXT_SOURCE_2': (0.0, 1.0, 0.01),
+    'EXT_SOURCE_3': (0.0, 1.0, 0.01),
+}
+
+# Amplitudes testées à chaque itération (en nombre de pas)
+STEP_MULTIPLIERS = (1, 2, 5, 10)
+
+# ==============================================================================
+# RECHERCHE CONTREFACTUELLE (BEAM SEARCH VECTORISÉE)
+# ==============================================================================
+
+def _apply_offsets(x0, feats, base, steps, lo, hi, offsets):
+    """Construit le lot de candidats : une ligne par vecteur d'offsets (en pas)."""
+    values = np.clip(base + offsets * steps, lo, hi)
+    batch = x0.loc[x0.index.repeat(len(offsets))].reset_index(drop=True)
+    batch[feats] = values
+    return batch, values
+
+
+def _offset_limits(base, steps, lo, hi):
+    """
+    Offsets extrêmes (en pas) : le plus petit nombre de pas qui atteint chaque
+    borne. Au-delà, la valeur serait identique (bloquée à la borne par le clip).
+    """
+    with np.errstate(invalid='ignore'):
+        k_min = np.where(np.isfinite(lo), -np.ceil((base - lo) / steps), np.iinfo(np.int32).min)
+        k_max = np.where(np.isfinite(hi), np.ceil((hi - base) / steps), np.iinfo(np.int32).max)
+    return np.minimum(k_min, 0).astype(np.int64), np.maximum(k_max, 0).astype(np.int64)
+
+
+def _neighbours(beam, n_feats, multipliers, k_min, k_max):
+    """Tous les voisins des états du beam : +/- m pas sur une seule variable (bornés)."""
+    moves = []
+    for m in multipliers:
+        eye = np.eye(n_feats, dtype=np.int64) * m
+        moves.append(eye)
+        moves.append(-eye)
+    moves = np.concatenate(moves)
+    cand = (beam[:, None, :] + moves[None, :, :]).reshape(-1, n_feats)
+    return np.unique(np.clip(cand, k_min, k_max), axis=0)
+
+
+def search_counterfactual(predict_proba, x0, features=None, shap_values=None,
+                          threshold=SEUIL_RISQUE, beam_width=8, max_iter=100,
+                          budget_ms=2000, multipliers=STEP_MULTIPLIERS,
+                          guided_share=0.5):
+    """
+    Cherche le plus petit changement des variables actionnables qui fait passer
+    la décision à "ACCORDÉ" (proba <= seuil).
+
+    Chaque itération score tous les voisins du beam en un seul appel à
+    `predict_proba`. Les variables dont la contribution SHAP est positive
+    (celles qui poussent vers le refus) sont explorées en priorité, avec une
+    part `guided_share` du budget : si cette recherche échoue, on relance sur
+    l'ensemble des variables actionnables avec le budget restant.
+    Le coût d'une solution est le nombre total de pas modifiés. Les valeurs
+    renvoyées sont exactement celles de la ligne scorée.
+    """
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000.0
+    features = ACTIONABLE_FEATURES if features is None else features
+
+    feats = [f for f in features if f in x0.columns]
+    if shap_values:
+        # Guidage SHAP : d'abord les seules variables qui augmentent le risque
+        positives = [f for f in feats if shap_values.get(f, 0) > 0]
+        if positives and len(positives) < len(feats):
+            params = dict(threshold=threshold, beam_width=beam_width, max_iter=max_iter, multipliers=multipliers)
+            guided = search_counterfactual(
+                predict_proba, x0, features={f: features[f] for f in positives},
+                budget_ms=budget_ms * guided_share, **params
+            )
+            if guided["found"]:
+                return guided
+
+            # Repli : toutes les variables actionnables, avec le budget restant
+            remaining_ms = max(budget_ms - (time.perf_counter() - start) * 1000, 0)
+            full = search_counterfactual(
+                predict_proba, x0, features={f: features[f] for f in feats},
+                budget_ms=remaining_ms, **params
+            )
+            result = full if full["found"] or full["score"] <= guided["score"] else guided
+            for key in ("n_evaluated", "iterations", "pruning_rounds"):
+                result[key] = guided[key] + full[key]
+            result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+            return result
+
+    base_proba = float(predict_proba(x0)[:, 1][0])
+    result = {
+        "found": base_proba <= threshold,
+        "initial_score": base_proba,
+        "score": base_proba,
+        "decision": "ACCORDÉ" if base_proba <= threshold else "REFUSÉ",
+        "threshold": threshold,
+        "changes": {},
+        "n_evaluated": 1,
+        "iterations": 0,
+        "pruning_rounds": 0,
+    }
+    if result["found"] or not feats:
+        result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+    base = x0.iloc[0][feats].astype(float).fillna(0).to_numpy()
+    steps = np.array([features[f][2] for f in feats], dtype=float)
+    lo = np.array([-np.inf if features[f][0] is None else features[f][0] for f in feats], dtype=float)
+    hi = np.array([np.inf if features[f][1] is None else features[f][1] for f in feats], dtype=float)
+    k_min, k_max = _offset_limits(base, steps, lo, hi)
+
+    n_feats = len(feats)
+    beam = np.zeros((1, n_feats), dtype=np.int64)
+    visited = {beam[0].tobytes()}
+    # Meilleur candidat / solution : (offsets, proba, valeurs exactes de la ligne scorée)
+    best = None
+    found = None
+
+    # 1. Beam search : on descend la probabilité jusqu'à franchir le seuil
+    while result["iterations"] < max_iter and time.perf_counter() < deadline:
+        result["iterations"] += 1
+        cand = _neighbours(beam, n_feats, multipliers, k_min, k_max)
+        fresh = np.array([c.tobytes() not in visited for c in cand])
+        cand = cand[fresh]
+        if len(cand) == 0:
+            break
+        visited.update(c.tobytes() for c in cand)
+
+        batch, values = _apply_offsets(x0, feats, base, steps, lo, hi, cand)
+        proba = predict_proba(batch)[:, 1]
+        result["n_evaluated"] += len(cand)
+
+        i_best = int(np.argmin(proba))
+        if best is None or proba[i_best] < best[1]:
+            best = (cand[i_best], float(proba[i_best]), values[i_best])
+
+        flipped = np.flatnonzero(proba <= threshold)
+        if len(flipped):
+            j = flipped[int(np.argmin(np.abs(cand[flipped]).sum(axis=1)))]
+            found = (cand[j], float(proba[j]), values[j])
+            break
+
+        order = np.lexsort((np.abs(cand).sum(axis=1), proba))[:beam_width]
+        beam = cand[order]
+
+    # 2. Élagage : on réduit chaque variable modifiée tant que la décision reste "ACCORDÉ"
+    while found is not None and time.perf_counter() < deadline:
+        found_offsets = found[0]
+        trials = []
+        for j in np.flatnonzero(found_offsets):
+            k = found_offsets[j]
+            for r in range(0, abs(k)):
+                t = found_offsets.copy()
+                t[j] = int(np.sign(k)) * r
+                trials.append(t)
+        if not trials:
+            break
+        trials = np.unique(np.array(trials), axis=0)
+        batch, values = _apply_offsets(x0, feats, base, steps, lo, hi, trials)
+        proba = predict_proba(batch)[:, 1]
+        result["n_evaluated"] += len(trials)
+        result["pruning_rounds"] += 1
+
+        ok = np.flatnonzero(proba <= threshold)
+        if not len(ok):
+            break
+        j = ok[int(np.argmin(np.abs(trials[ok]).sum(axis=1)))]
+        if np.abs(trials[j]).sum() >= np.abs(found_offsets).sum():
+            break
+        found = (trials[j], float(proba[j]), values[j])
+
+    # 3. Formatage du résultat (valeurs exactes de la ligne scorée)
+    chosen = found or best
+    if chosen is not None:
+        offsets, score, final_values = chosen
+    else:
+        offsets, score, final_values = np.zeros(n_feats, dtype=np.int64), base_proba, base
+
+    result["found"] = found is not None
+    result["score"] = float(score)
+    result["decision"] = "ACCORDÉ" if score <= threshold else "REFUSÉ"
+    result["changes"] = {
+        f: {"from": float(base[i]), "to": float(final_values[i])}
+        for i, f in enumerate(feats) if offsets[i] != 0
+    }
+    result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return result
@@ -1,16 +1,24 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 import math
+import os
+import time
+from contextlib import contextmanager
+from cohort_shap import CohortShapStore, SHAP_MATRIX_FILE, SEGMENT_PREFIXES
+from scoring_backend import BACKENDS, BACKEND_LABELS, MODEL_DIR, default_backend, load_embedded_model, predict_embedded, predict_http, unpack_api_result
 
 # ==============================================================================
 # CONFIGURATION & CONSTANTES
 # ==============================================================================
 
-API_URL = "https://p8-scoring-dashboard.onrender.com/invocations"
+# API_URL / SCORING_BACKEND / MODEL_DIR : configurables par variables d'environnement (scoring_backend.py)
+MLMODEL_FILE = os.path.join(MODEL_DIR, "MLmodel")
+
+# Fragments Streamlit (>= 1.37, "experimental" avant) : rerun limité à la section modifiée
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda func: func)
 
 st.set_page_config(
     page_title="Dashboard Scoring Crédit",
@@ -30,6 +38,14 @@ if 'is_simulation' not in st.session_state:
     st.session_state.is_simulation = False
 if 'last_selected_id' not in st.session_state:
     st.session_state.last_selected_id = None
+if 'render_times' not in st.session_state:
+    st.session_state.render_times = {}
+if 'debug_mode' not in st.session_state:
+    st.session_state.debug_mode = False
+if 'scoring_backend' not in st.session_state:
+    st.session_state.scoring_backend = default_backend()
+if 'rescore_pending' not in st.session_state:
+    st.session_state.rescore_pending = False
 
 # ==============================================================================
 # GESTION DES DONNÉES & UTILITAIRES
@@ -53,6 +69,30 @@ def load_global_importance():
     except FileNotFoundError:
         return pd.DataFrame()
 
+@st.cache_data
+def load_model_version():
+    """Identifiant du modèle servi (clé de cache des graphiques)"""
+    try:
+        with open(MLMODEL_FILE, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model_uuid:"):
+                    return line.split(":", 1)[1].strip()
+    except FileNotFoundError:
+        pass
+    return "inconnu"
+
+MODEL_VERSION = load_model_version()
+
+@st.cache_resource
+def load_cohort_store():
+    """Matrice SHAP précalculée (partagée entre sessions, mise à jour en mémoire : non sauvegardée)."""
+    if not os.path.exists(SHAP_MATRIX_FILE):
+        return None
+    try:
+        return CohortShapStore.load(SHAP_MATRIX_FILE)
+    except Exception:
+        return None
+
 def get_client_info(client_id):
     if client_id == "Nouveau Dossier":
         return {
@@ -72,25 +112,62 @@ def get_client_info(client_id):
         "Email": f"client.{client_id}@email.com"
     }
 
+@st.cache_resource(show_spinner="Chargement du modèle de production...")
+def get_embedded_model():
+    """Modèle de production chargé une seule fois (partagé entre sessions)"""
+    return load_embedded_model()
+
 def call_api(features):
-    """Envoie les données à l'API et met à jour la session"""
+    """Envoie les données au backend de scoring (API ou modèle embarqué) et met à jour la session"""
     cols_excluded = ['TARGET', 'SK_ID_CURR', 'index', 'Unnamed: 0']
     clean_features = {k: (0 if pd.isna(v) else v) for k, v in features.items() if k not in cols_excluded}
     
+    backend = st.session_state.scoring_backend
+    start = time.perf_counter()
     try:
-        payload = {"dataframe_records": [clean_features]}
-        response = requests.post(API_URL, json=payload)
-        if response.status_code == 200:
-            st.session_state.api_data = response.json()
-            st.session_state.api_data['clean_features'] = clean_features 
-            return True
+        if backend == "embedded":
+            # Mode embarqué : modèle chargé une seule fois, aucun aller-retour réseau
+            st.session_state.api_data = predict_embedded(get_embedded_model(), [clean_features])
         else:
-            st.error(f"Erreur API : {response.status_code}")
-            return False
+            response = predict_http([clean_features])
+            if response.status_code != 200:
+                st.error(f"Erreur API : {response.status_code}")
+                return False
+            st.session_state.api_data = response.json()
+        st.session_state.api_data['clean_features'] = clean_features 
+        st.session_state.api_data['backend'] = backend
+        st.session_state.render_times[f"Scoring ({backend})"] = (time.perf_counter() - start) * 1000
+        return True
     except Exception as e:
         st.error(f"Erreur technique : {e}")
         return False
 
+def update_cohort(client_id):
+    """Ajoute le client scoré (données réelles, hors simulation) aux agrégats de cohorte"""
+    store = load_cohort_store()
+    if store is None or not st.session_state.api_data:
+        return
+    clean_features = st.session_state.api_data.get('clean_features', {})
+    score, _, _, shap_values = unpack_api_result(st.session_state.api_data, clean_features)
+    if shap_values:
+        store.upsert(
+            [client_id],
+            store.shap_row_from_dict(shap_values),
+            [score],
+            store.membership_from_features(clean_features)
+        )
+
+def on_backend_change():
+    """Changement de backend : le dossier affiché devra être rescoré par le nouveau backend"""
+    st.session_state.rescore_pending = True
+
+# Rescoring du dossier affiché (données simulées comprises) après un changement de backend
+if st.session_state.rescore_pending:
+    st.session_state.rescore_pending = False
+    if st.session_state.api_data:
+        with st.spinner('Mise à jour du score...'):
+            call_api(st.session_state.api_data['clean_features'])
+
 # ==============================================================================
 # SIDEBAR (LOGIQUE AUTOMATIQUE + SIMULATION)
 # ==============================================================================
@@ -121,7 +198,8 @@ if not df.empty:
             st.session_state.is_simulation = False
             
             with st.spinner('Chargement et analyse du dossier...'):
-                call_api(base_data)
+                if call_api(base_data) and display_id != "Nouveau Dossier":
+                    update_cohort(display_id)
 
         # 3. Formulaire Simulation
         st.sidebar.markdown("---")
@@ -172,6 +250,224 @@ if not global_feat_importance.empty:
     st.sidebar.plotly_chart(fig_global, use_container_width=True)
     st.sidebar.caption("📊 **Lecture :** Variables ayant le plus de poids dans le modèle global.")
 
+st.sidebar.markdown("---")
+st.sidebar.subheader("⚙️ Mode de scoring")
+st.sidebar.radio(
+    "Backend", BACKENDS, key="scoring_backend", horizontal=True,
+    format_func=BACKEND_LABELS.get, on_change=on_backend_change
+)
+st.sidebar.caption("Le mode embarqué évite l'aller-retour réseau (latence WAN, démarrage à froid de l'API).")
+st.sidebar.checkbox("🐞 Mode debug : temps de rendu", key="debug_mode")
+
+# ==============================================================================
+# CONSTRUCTION DES GRAPHIQUES (MÉMOÏSÉE PAR ENTRÉES)
+# ==============================================================================
+# Chaque figure est mise en cache selon ses entrées (valeurs du client, variable,
+# version du modèle...) : un rerun qui ne change pas ces entrées ne reconstruit rien.
+# max_entries borne la mémoire : chaque entrée embarque les données de la population.
+FIGURE_CACHE_ENTRIES = 32
+
+def draw_arc(start, end, color):
+    theta = np.linspace(math.radians(start), math.radians(end), 50)
+    x_out, y_out = np.cos(theta), np.sin(theta)
+    x_in, y_in = 0.6 * np.cos(theta[::-1]), 0.6 * np.sin(theta[::-1])
+    return go.Scatter(x=np.concatenate([x_out, x_in, [x_out[0]]]), y=np.concatenate([y_out, y_in, [y_out[0]]]), fill='toself', mode='none', fillcolor=color, hoverinfo='skip')
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_gauge_figure(score, threshold):
+    gauge_max = threshold * 2 
+    visual_score = max(0, min(score, gauge_max))
+    angle_deg = 180 - (visual_score / gauge_max) * 180
+    angle_rad = math.radians(angle_deg)
+    
+    fig = go.Figure()
+    fig.add_trace(draw_arc(90, 180, "#2ecc71"))
+    fig.add_trace(draw_arc(0, 90, "#e74c3c"))
+    
+    needle_len = 0.9
+    fig.add_trace(go.Scatter(x=[0, needle_len*math.cos(angle_rad)], y=[0, needle_len*math.sin(angle_rad)], mode='lines', line=dict(color='#2c3e50', width=5), hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=[0], y=[0], mode='markers', marker=dict(color='#2c3e50', size=15), hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=[0], y=[0.25], mode='text', text=[f"{visual_score:.1%}"], textfont=dict(size=40, color="white"), hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=[0], y=[1.15], mode='text', text=["Score de Risque"], textfont=dict(size=18, color="gray"), hoverinfo='skip'))
+
+    fig.update_layout(xaxis=dict(range=[-1.2, 1.2], visible=False, scaleanchor='y', scaleratio=1), yaxis=dict(range=[0, 1.3], visible=False), margin=dict(l=20, r=20, t=20, b=20), height=300, showlegend=False)
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_shap_figure(shap_items, model_version):
+    shap_df = pd.DataFrame(list(shap_items), columns=['Feature', 'Impact'])
+    shap_df['Abs_Impact'] = shap_df['Impact'].abs()
+    fig_shap = px.bar(shap_df.sort_values(by='Abs_Impact', ascending=False).head(15).sort_values(by='Impact'), x='Impact', y='Feature', orientation='h', color='Impact', color_continuous_scale=['#2ecc71', '#e74c3c'])
+    # TON TITRE DE GRAPHIQUE EXACT
+    fig_shap.update_layout(title="Top 15 des variables contributrices", xaxis_title="Contribution au risque (Gauche = Baisse, Droite = Hausse)", yaxis_title=None, showlegend=False, coloraxis_showscale=False, height=500)
+    fig_shap.add_vline(x=0, line_width=1, line_color="white", opacity=0.5)
+    return fig_shap
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_distribution_figure(compare_var, client_val, model_version):
+    fig_dist = px.histogram(df, x=compare_var, nbins=50, title=f"Distribution : {compare_var}", color_discrete_sequence=['#95a5a6'], opacity=0.6)
+    fig_dist.add_vline(x=client_val, line_width=3, line_dash="dash", line_color="#e74c3c", annotation_text="Client")
+    fig_dist.update_layout(showlegend=False, margin=dict(l=50, r=20, t=40, b=50))
+    return fig_dist
+
+def axis_values(var, client_val):
+    """Colonne de la population + valeur client (âge en années pour DAYS_BIRTH), sans copie du DataFrame"""
+    if var == 'DAYS_BIRTH':
+        return 'AGE_YEARS', (df['DAYS_BIRTH'] / -365).astype(int), int(client_val / -365)
+    return var, df[var], client_val
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_bivariate_figure(var_x, var_y, client_val_x, client_val_y, model_version):
+    plot_var_x, pop_x, client_val_x = axis_values(var_x, client_val_x)
+    plot_var_y, pop_y, client_val_y = axis_values(var_y, client_val_y)
+
+    fig_bi = go.Figure()
+    fig_bi.add_trace(go.Scatter(x=pop_x, y=pop_y, mode='markers', marker=dict(color='#bdc3c7', size=5, opacity=0.3), name='Population'))
+    fig_bi.add_trace(go.Scatter(x=[client_val_x], y=[client_val_y], mode='markers', marker=dict(color='red', size=15, symbol='star', opacity=1.0), name='Client Sélectionné'))
+    fig_bi.update_layout(title=f"Croisement : {plot_var_x} vs {plot_var_y}", title_font_size=20, xaxis_title=plot_var_x, yaxis_title=plot_var_y, margin=dict(l=50, r=20, t=40, b=50))
+    return fig_bi
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_segment_figure(_store, prefix, store_version):
+    seg_df = _store.segments(prefix)
+    fig_seg = px.bar(seg_df.sort_values(by='Taux_Refus'), x='Taux_Refus', y='Segment', orientation='h', hover_data=['Effectif'], color_discrete_sequence=['#e74c3c'])
+    fig_seg.add_vline(x=_store.overall_refusal_rate(), line_width=2, line_dash="dash", line_color="white", annotation_text="Moyenne")
+    fig_seg.update_layout(title="Taux de refus par segment", xaxis_title="Taux de refus", xaxis_tickformat=".0%", yaxis_title=None, margin=dict(l=50, r=20, t=40, b=50))
+    return fig_seg
+
+@st.cache_data(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def build_segment_profile_figures(_store, segment, store_version):
+    profile = _store.segment_profile(segment)
+    fig_abs = px.bar(profile.sort_values(by='Mean_Abs_SHAP'), x='Mean_Abs_SHAP', y='Feature', orientation='h', color_discrete_sequence=['#3498db'])
+    fig_abs.update_layout(title="Importance moyenne |SHAP|", xaxis_title=None, yaxis_title=None, height=500)
+    fig_sign = px.bar(profile.sort_values(by='Mean_SHAP'), x='Mean_SHAP', y='Feature', orientation='h', color='Mean_SHAP', color_continuous_scale=['#2ecc71', '#e74c3c'])
+    fig_sign.update_layout(title="Effet moyen SHAP (signé)", xaxis_title=None, yaxis_title=None, coloraxis_showscale=False, height=500)
+    fig_sign.add_vline(x=0, line_width=1, line_color="white", opacity=0.5)
+    return fig_abs, fig_sign
+
+# ==============================================================================
+# SECTIONS (FRAGMENTS : SEULE LA SECTION MODIFIÉE EST RÉEXÉCUTÉE)
+# ==============================================================================
+
+@contextmanager
+def timed_section(name):
+    """
+    Mesure le temps de rendu d'une section. En mode debug, le temps est affiché
+    à la fin de la section, dans son fragment : une réexécution partielle
+    affiche donc son propre coût.
+    """
+    start = time.perf_counter()
+    yield
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.session_state.render_times[name] = elapsed_ms
+    if st.session_state.debug_mode:
+        st.caption(f"🐞 {name} : rendu en {elapsed_ms:.1f} ms")
+
+@fragment
+def section_decision(score, decision, threshold):
+    with timed_section("1. Synthèse"):
+        st.subheader("1️⃣ Synthèse de la décision")
+        col1, col2 = st.columns([1, 2])
+        
+        with col1:
+            color = "#2ecc71" if decision == "ACCORDÉ" else "#e74c3c"
+            st.markdown(f"""
+                <div style="text-align: center; padding: 20px; border: 2px solid {color}; border-radius: 10px; margin-top: 40px; background-color: rgba(255,255,255,0.05);">
+                    <h2 style="color: {color}; margin-bottom: 10px;">{decision}</h2>
+                    <hr style="margin: 10px 0; border-top: 1px solid {color}; opacity: 0.3;">
+                    <p style="margin: 0; font-size: 1.1em;">Probabilité de défaut : <strong style="font-size: 1.2em;">{score:.1%}</strong></p>
+                </div>
+                """, unsafe_allow_html=True)
+                
+        with col2:
+            st.plotly_chart(build_gauge_figure(score, threshold), use_container_width=True)
+            # TON TEXTE EXACT POUR LA JAUGE
+            st.caption(f"Le seuil de risque est fixé à **{threshold:.1%}**. Si l'aiguille est dans la zone verte, le crédit est accordé.")
+
+@fragment
+def section_shap(current_id, shap_values):
+    with timed_section("2. Interprétabilité"):
+        st.markdown("---")
+        # TON TITRE EXACT
+        st.subheader("2️⃣ Interprétabilité : Facteurs d'influence (Local)")
+        # TON CAPTION EXACT
+        st.caption(f"Pourquoi le client {current_id} a eu ce score précis ?")
+        
+        if shap_values:
+            fig_shap = build_shap_figure(tuple(shap_values.items()), MODEL_VERSION)
+            st.plotly_chart(fig_shap, use_container_width=True)
+            # TON INFO EXACTE (si présente dans l'ancien, sinon je garde l'aide lecture)
+            st.info("💡 **Lecture :** Les barres **ROUGES** (à droite) augmentent le risque de défaut. Les barres **VERTES** (à gauche) diminuent le risque.")
+
+@fragment
+def section_univariate(current_id, clean_features):
+    with timed_section("3. Uni-variée"):
+        st.markdown("---")
+        # TON TITRE EXACT
+        st.subheader("3️⃣ Comparaison Uni-variée")
+        # TON CAPTION EXACT
+        st.caption(f"Où se situe le client {current_id} par rapport à l'ensemble de la population ?")
+        
+        col_u1, col_u2 = st.columns([1, 3])
+        with col_u1:
+            compare_var = st.selectbox("Variable à comparer :", ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'EXT_SOURCE_2', 'EXT_SOURCE_3', 'DAYS_BIRTH'], index=0)
+        
+        with col_u2:
+            if compare_var in df.columns:
+                client_val = clean_features.get(compare_var, 0)
+                fig_dist = build_distribution_figure(compare_var, client_val, MODEL_VERSION)
+                st.plotly_chart(fig_dist, use_container_width=True)
+
+@fragment
+def section_bivariate(current_id, clean_features):
+    with timed_section("4. Bi-variée"):
+        st.markdown("---")
+        # TON TITRE EXACT
+        st.subheader("4️⃣ Comparaison Bi-variée (Croisement)")
+        # TON CAPTION EXACT
+        st.caption(f"Le profil du client {current_id} est-il atypique selon ces deux critères combinés ?")
+        
+        col_b1, col_b2 = st.columns([1, 3])
+        with col_b1:
+            var_x = st.selectbox("Axe X :", ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'DAYS_BIRTH'], index=1)
+            var_y = st.selectbox("Axe Y :", ['AMT_CREDIT', 'AMT_ANNUITY', 'DAYS_BIRTH', 'EXT_SOURCE_2'], index=2)
+
+        with col_b2:
+            if var_x in df.columns and var_y in df.columns:
+                fig_bi = build_bivariate_figure(var_x, var_y, clean_features.get(var_x, 0), clean_features.get(var_y, 0), MODEL_VERSION)
+                st.plotly_chart(fig_bi, use_container_width=True)
+
+@fragment
+def section_cohort():
+    with timed_section("5. Cohorte"):
+        st.markdown("---")
+        st.subheader("5️⃣ Analyse de cohorte : Facteurs de refus par segment")
+        st.caption("Qu'est-ce qui pèse sur les décisions d'un segment de clientèle ?")
+
+        cohort_store = load_cohort_store()
+        if cohort_store is None:
+            st.info(f"Matrice SHAP indisponible : lancer `python cohort_shap.py` pour générer '{SHAP_MATRIX_FILE}'.")
+            return
+
+        available_prefixes = [p for p in SEGMENT_PREFIXES if any(s.startswith(p) for s in cohort_store.segment_names)]
+        col_c1, col_c2 = st.columns([1, 3])
+        with col_c1:
+            cohort_prefix = st.selectbox("Type de segment :", available_prefixes, index=0) if available_prefixes else None
+
+        if cohort_prefix:
+            with col_c2:
+                st.plotly_chart(build_segment_figure(cohort_store, cohort_prefix, cohort_store.version), use_container_width=True)
+
+            seg_options = cohort_store.segments(cohort_prefix)['Colonne'].tolist()
+            seg_choice = st.selectbox("Segment à analyser :", seg_options, format_func=lambda c: c[len(cohort_prefix):])
+            fig_abs, fig_sign = build_segment_profile_figures(cohort_store, seg_choice, cohort_store.version)
+            col_p1, col_p2 = st.columns(2)
+            with col_p1:
+                st.plotly_chart(fig_abs, use_container_width=True)
+            with col_p2:
+                st.plotly_chart(fig_sign, use_container_width=True)
+            st.info("💡 **Lecture :** À gauche, les variables qui pèsent le plus dans le segment. À droite, le sens moyen de leur effet (ROUGE = hausse du risque).")
+
 # ==============================================================================
 # CORPS PRINCIPAL
 # ==============================================================================
@@ -187,157 +483,33 @@ if st.session_state.api_data:
     infos = get_client_info(current_id)
     
     # --- FICHE CLIENT ---
-    with st.container():
+    with timed_section("0. Fiche client"), st.container():
         if getattr(st.session_state, 'is_simulation', False) or current_id == "Nouveau Dossier":
             st.warning("⚠️ **Mode Simulation actif :** Résultats basés sur les données modifiées.")
             
         st.markdown("### 👤 Fiche Client")
+        st.caption(f"Score calculé par : {BACKEND_LABELS.get(api_result.get('backend'), 'inconnu')}")
         col_info1, col_info2, col_info3, col_info4 = st.columns(4)
         col_info1.metric("Nom", f"{infos['Nom']} {infos['Prénom']}")
         col_info2.metric("ID Client", str(current_id)) # Ton texte : "ID Client"
         col_info3.metric("Ville", infos['Ville']) # Ajouté car présent dans ton ancien code
         col_info4.metric("Revenu Annuel", f"{clean_features.get('AMT_INCOME_TOTAL', 0):,.0f} $")
+        scoring_key = f"Scoring ({api_result.get('backend')})"
+        if st.session_state.debug_mode and scoring_key in st.session_state.render_times:
+            st.caption(f"🐞 {scoring_key} : {st.session_state.render_times[scoring_key]:.1f} ms — Modèle : {MODEL_VERSION}")
         st.markdown("---")
 
-    # DÉBALLAGE JSON
-    if isinstance(api_result, dict) and "predictions" in api_result:
-        preds = api_result["predictions"]
-        data = preds[0] if isinstance(preds, list) else preds
-    elif isinstance(api_result, list):
-        data = api_result[0]
-    else:
-        data = api_result
-
-    score_raw = data.get('score', [0])
-    score = score_raw[0] if isinstance(score_raw, list) else score_raw
-    decision_raw = data.get('decision', ["Inconnu"])
-    decision = decision_raw[0] if isinstance(decision_raw, list) else decision_raw
-    threshold_raw = data.get('threshold', 0.5)
-    threshold = threshold_raw[0] if isinstance(threshold_raw, list) else threshold_raw
-    shap_values_raw = data.get('shap_values', [])
-    if shap_values_raw:
-        raw_list = shap_values_raw[0] if isinstance(shap_values_raw[0], list) else shap_values_raw
-        shap_values = dict(zip(clean_features.keys(), raw_list))
-    else:
-        shap_values = {}
-    
-    # --- 1. JAUGE GÉOMÉTRIQUE ---
-    st.subheader("1️⃣ Synthèse de la décision")
-    col1, col2 = st.columns([1, 2])
+    score, decision, threshold, shap_values = unpack_api_result(api_result, clean_features)
     
-    with col1:
-        color = "#2ecc71" if decision == "ACCORDÉ" else "#e74c3c"
-        st.markdown(f"""
-            <div style="text-align: center; padding: 20px; border: 2px solid {color}; border-radius: 10px; margin-top: 40px; background-color: rgba(255,255,255,0.05);">
-                <h2 style="color: {color}; margin-bottom: 10px;">{decision}</h2>
-                <hr style="margin: 10px 0; border-top: 1px solid {color}; opacity: 0.3;">
-                <p style="margin: 0; font-size: 1.1em;">Probabilité de défaut : <strong style="font-size: 1.2em;">{score:.1%}</strong></p>
-            </div>
-            """, unsafe_allow_html=True)
-            
-    with col2:
-        gauge_max = threshold * 2 
-        visual_score = max(0, min(score, gauge_max))
-        angle_deg = 180 - (visual_score / gauge_max) * 180
-        angle_rad = math.radians(angle_deg)
-        
-        fig = go.Figure()
-        def draw_arc(start, end, color):
-            theta = np.linspace(math.radians(start), math.radians(end), 50)
-            x_out, y_out = np.cos(theta), np.sin(theta)
-            x_in, y_in = 0.6 * np.cos(theta[::-1]), 0.6 * np.sin(theta[::-1])
-            return go.Scatter(x=np.concatenate([x_out, x_in, [x_out[0]]]), y=np.concatenate([y_out, y_in, [y_out[0]]]), fill='toself', mode='none', fillcolor=color, hoverinfo='skip')
-
-        fig.add_trace(draw_arc(90, 180, "#2ecc71"))
-        fig.add_trace(draw_arc(0, 90, "#e74c3c"))
-        
-        needle_len = 0.9
-        fig.add_trace(go.Scatter(x=[0, needle_len*math.cos(angle_rad)], y=[0, needle_len*math.sin(angle_rad)], mode='lines', line=dict(color='#2c3e50', width=5), hoverinfo='skip'))
-        fig.add_trace(go.Scatter(x=[0], y=[0], mode='markers', marker=dict(color='#2c3e50', size=15), hoverinfo='skip'))
-        fig.add_trace(go.Scatter(x=[0], y=[0.25], mode='text', text=[f"{visual_score:.1%}"], textfont=dict(size=40, color="white"), hoverinfo='skip'))
-        fig.add_trace(go.Scatter(x=[0], y=[1.15], mode='text', text=["Score de Risque"], textfont=dict(size=18, color="gray"), hoverinfo='skip'))
-
-        fig.update_layout(xaxis=dict(range=[-1.2, 1.2], visible=False, scaleanchor='y', scaleratio=1), yaxis=dict(range=[0, 1.3], visible=False), margin=dict(l=20, r=20, t=20, b=20), height=300, showlegend=False)
-        st.plotly_chart(fig, use_container_width=True)
-        # TON TEXTE EXACT POUR LA JAUGE
-        st.caption(f"Le seuil de risque est fixé à **{threshold:.1%}**. Si l'aiguille est dans la zone verte, le crédit est accordé.")
-
-    # --- 2. SHAP ---
-    st.markdown("---")
-    # TON TITRE EXACT
-    st.subheader("2️⃣ Interprétabilité : Facteurs d'influence (Local)")
-    # TON CAPTION EXACT
-    st.caption(f"Pourquoi le client {current_id} a eu ce score précis ?")
-    
-    if shap_values:
-        shap_df = pd.DataFrame(list(shap_values.items()), columns=['Feature', 'Impact'])
-        shap_df['Abs_Impact'] = shap_df['Impact'].abs()
-        fig_shap = px.bar(shap_df.sort_values(by='Abs_Impact', ascending=False).head(15).sort_values(by='Impact'), x='Impact', y='Feature', orientation='h', color='Impact', color_continuous_scale=['#2ecc71', '#e74c3c'])
-        # TON TITRE DE GRAPHIQUE EXACT
-        fig_shap.update_layout(title="Top 15 des variables contributrices", xaxis_title="Contribution au risque (Gauche = Baisse, Droite = Hausse)", yaxis_title=None, showlegend=False, coloraxis_showscale=False, height=500)
-        fig_shap.add_vline(x=0, line_width=1, line_color="white", opacity=0.5)
-        st.plotly_chart(fig_shap, use_container_width=True)
-        # TON INFO EXACTE (si présente dans l'ancien, sinon je garde l'aide lecture)
-        st.info("💡 **Lecture :** Les barres **ROUGES** (à droite) augmentent le risque de défaut. Les barres **VERTES** (à gauche) diminuent le risque.")
-
-    # --- 3. UNI-VARIÉE ---
-    st.markdown("---")
-    # TON TITRE EXACT
-    st.subheader("3️⃣ Comparaison Uni-variée")
-    # TON CAPTION EXACT
-    st.caption(f"Où se situe le client {current_id} par rapport à l'ensemble de la population ?")
-    
-    col_u1, col_u2 = st.columns([1, 3])
-    with col_u1:
-        compare_var = st.selectbox("Variable à comparer :", ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'EXT_SOURCE_2', 'EXT_SOURCE_3', 'DAYS_BIRTH'], index=0)
-    
-    with col_u2:
-        if compare_var in df.columns:
-            client_val = clean_features.get(compare_var, 0)
-            fig_dist = px.histogram(df, x=compare_var, nbins=50, title=f"Distribution : {compare_var}", color_discrete_sequence=['#95a5a6'], opacity=0.6)
-            fig_dist.add_vline(x=client_val, line_width=3, line_dash="dash", line_color="#e74c3c", annotation_text="Client")
-            fig_dist.update_layout(showlegend=False, margin=dict(l=50, r=20, t=40, b=50))
-            st.plotly_chart(fig_dist, use_container_width=True)
-    
-    # --- 4. BI-VARIÉE ---
-    st.markdown("---")
-    # TON TITRE EXACT
-    st.subheader("4️⃣ Comparaison Bi-variée (Croisement)")
-    # TON CAPTION EXACT
-    st.caption(f"Le profil du client {current_id} est-il atypique selon ces deux critères combinés ?")
-    
-    col_b1, col_b2 = st.columns([1, 3])
-    with col_b1:
-        var_x = st.selectbox("Axe X :", ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'DAYS_BIRTH'], index=1)
-        var_y = st.selectbox("Axe Y :", ['AMT_CREDIT', 'AMT_ANNUITY', 'DAYS_BIRTH', 'EXT_SOURCE_2'], index=2)
-
-    with col_b2:
-        if var_x in df.columns and var_y in df.columns:
-            plot_df = df.copy()
-            if var_x == 'DAYS_BIRTH': 
-                plot_df['AGE_YEARS'] = (plot_df['DAYS_BIRTH'] / -365).astype(int)
-                plot_var_x = 'AGE_YEARS'
-                client_val_x = int(clean_features.get(var_x, 0) / -365)
-            else:
-                plot_var_x = var_x
-                client_val_x = clean_features.get(var_x, 0)
-                
-            if var_y == 'DAYS_BIRTH':
-                plot_df['AGE_YEARS'] = (plot_df['DAYS_BIRTH'] / -365).astype(int)
-                plot_var_y = 'AGE_YEARS'
-                client_val_y = int(clean_features.get(var_y, 0) / -365)
-            else:
-                plot_var_y = var_y
-                client_val_y = clean_features.get(var_y, 0)
-
-            fig_bi = go.Figure()
-            fig_bi.add_trace(go.Scatter(x=plot_df[plot_var_x], y=plot_df[plot_var_y], mode='markers', marker=dict(color='#bdc3c7', size=5, opacity=0.3), name='Population'))
-            fig_bi.add_trace(go.Scatter(x=[client_val_x], y=[client_val_y], mode='markers', marker=dict(color='red', size=15, symbol='star', opacity=1.0), name='Client Sélectionné'))
-            fig_bi.update_layout(title=f"Croisement : {plot_var_x} vs {plot_var_y}", title_font_size=20, xaxis_title=plot_var_x, yaxis_title=plot_var_y, margin=dict(l=50, r=20, t=40, b=50))
-            st.plotly_chart(fig_bi, use_container_width=True)
+    # --- 1 à 5 : SECTIONS ISOLÉES ---
+    section_decision(score, decision, threshold)
+    section_shap(current_id, shap_values)
+    section_univariate(current_id, clean_features)
+    section_bivariate(current_id, clean_features)
+    section_cohort()
 
     with st.expander("🔎 Audit des données"):
         st.json(clean_features)
 
 elif selected_option == "Sélectionner un ID...":
-    st.info("👈 Veuillez sélectionner un dossier ou créer une simulation dans la barre latérale.")
\ No newline at end of file
+    st.info("👈 Veuillez sélectionner un dossier ou créer une simulation dans la barre latérale.")
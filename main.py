@@ -1,12 +1,17 @@
 import uvicorn
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import pandas as pd
 import mlflow.sklearn
 import shap  # --- P8 ADDITION : Import de SHAP
 import numpy as np
 import os
+import threading
+import time
 import joblib
+from typing import Dict, List, Optional
+from cohort_shap import CohortShapStore, SEUIL_RISQUE, SHAP_MATRIX_FILE, extraire_shap_positif, split_pipeline  # --- P8 ADDITION : Analyse de cohorte
+from counterfactual import search_counterfactual, ACTIONABLE_FEATURES  # --- P8 ADDITION : Contrefactuels
 
 # Initialisation de l'application FastAPI
 app = FastAPI(
@@ -16,6 +21,7 @@ app = FastAPI(
 )
 
 # --- CONFIGURATION MLOPS ---
+# Seuil métier : SEUIL_RISQUE (défini une seule fois dans cohort_shap.py)
 import joblib # <--- Assure-toi d'importer ça
 
 # --- CHARGEMENT DU MODÈLE ---
@@ -25,6 +31,7 @@ MODEL_FILE = "./mlruns/9/models/m-0a84d69a2e314f0e82736c01fbcdd540/artifacts/mod
 print(f"Chargement du modèle depuis : {MODEL_FILE}")
 model = None
 explainer = None
+preprocessor = None
 
 try:
     # On utilise joblib directement (plus robuste que mlflow.sklearn)
@@ -32,8 +39,11 @@ try:
     print("Succès : Modèle chargé via Joblib.")
     
     # Initialisation de SHAP
+    # Le modèle est un Pipeline (imputer, scaler, SMOTE, classifieur) : SHAP ne
+    # travaille que sur le classifieur final, avec des données déjà transformées
     try:
-        explainer = shap.TreeExplainer(model)
+        classifier, preprocessor = split_pipeline(model)
+        explainer = shap.TreeExplainer(classifier)
     except Exception as e_shap:
         print(f"Attention SHAP : {e_shap}")
         
@@ -41,15 +51,89 @@ except Exception as e:
     print(f"ERREUR CRITIQUE : Impossible de lire le fichier modèle.")
     print(f"Détail : {e}")
 
+# --- CHARGEMENT DE LA MATRICE SHAP (ANALYSE DE COHORTE) ---
+# Les mises à jour incrémentales sont sauvegardées en tâche de fond toutes les
+# COHORT_SAVE_INTERVAL_S secondes (si modifiées) et à l'arrêt de l'API :
+# jamais dans le thread d'une requête /predict
+COHORT_SAVE_INTERVAL_S = 60
+cohort_store = None
+if os.path.exists(SHAP_MATRIX_FILE):
+    try:
+        cohort_store = CohortShapStore.load(SHAP_MATRIX_FILE)
+        print(f"Succès : Matrice SHAP chargée ({cohort_store.shap.shape[0]} clients).")
+    except Exception as e_cohort:
+        print(f"Attention Cohorte : {e_cohort}")
+
+cohort_saved_version = 0
+
+def save_cohort_if_changed():
+    global cohort_saved_version
+    if cohort_store is not None and cohort_store.version != cohort_saved_version:
+        try:
+            cohort_saved_version = cohort_store.save(SHAP_MATRIX_FILE)
+        except Exception as e_save:
+            print(f"Attention Cohorte (sauvegarde) : {e_save}")
+
+def cohort_autosave_loop():
+    while True:
+        time.sleep(COHORT_SAVE_INTERVAL_S)
+        save_cohort_if_changed()
+
+if cohort_store is not None:
+    threading.Thread(target=cohort_autosave_loop, daemon=True).start()
+
+@app.on_event("shutdown")
+def save_cohort_on_shutdown():
+    save_cohort_if_changed()
+
+# --- LIMITES DE LA RECHERCHE CONTREFACTUELLE ---
+MAX_BUDGET_MS = 10000
+MAX_BEAM_WIDTH = 64
+
 class ClientData(BaseModel):
     features: dict
+    # À activer uniquement pour un dossier réel non modifié (pas de simulation) :
+    # le client est alors ajouté / mis à jour dans les agrégats de cohorte
+    record_cohort: bool = False
+
+class CounterfactualRequest(BaseModel):
+    features: dict
+    budget_ms: int = Field(2000, gt=0, le=MAX_BUDGET_MS)  # Budget de latence fixé par l'appelant
+    beam_width: int = Field(8, gt=0, le=MAX_BEAM_WIDTH)
+    # Bornes et pas optionnels : {"AMT_CREDIT": [min, max, pas], ...}
+    bounds: Optional[Dict[str, List[Optional[float]]]] = None
+
+def prepare_features(features):
+    """Transformation en DataFrame, nettoyage technique et alignement des colonnes"""
+    # 1. Transformation en DataFrame
+    df = pd.DataFrame([features])
+    
+    # 2. Nettoyage technique
+    cols_techniques = ['SK_ID_CURR', 'TARGET', 'index', 'Unnamed: 0']
+    df_clean = df.drop(columns=[c for c in cols_techniques if c in df.columns], errors='ignore')
+
+    # 3. Alignement des colonnes (Sécurité)
+    if hasattr(model, "feature_names_in_"):
+        expected_cols = model.feature_names_in_
+        missing_cols = set(expected_cols) - set(df_clean.columns)
+        if missing_cols:
+            for c in missing_cols:
+                df_clean[c] = 0
+        df_clean = df_clean[expected_cols]
+    return df_clean
+
+def compute_shap(df_clean):
+    """SHAP values (classe positive) du 1er client, calculées sur les données transformées"""
+    data_for_shap = preprocessor.transform(df_clean) if preprocessor is not None else df_clean
+    return extraire_shap_positif(explainer.shap_values(data_for_shap))[0]
 
 @app.get("/")
 def health_check():
     return {
         "status": "API en ligne",
         "model_loaded": model is not None,
-        "explainer_ready": explainer is not None
+        "explainer_ready": explainer is not None,
+        "cohort_ready": cohort_store is not None
     }
 
 @app.post("/predict")
@@ -58,27 +142,14 @@ def predict_credit_score(data: ClientData):
         raise HTTPException(status_code=503, detail="Service indisponible : Modèle non chargé.")
     
     try:
-        # 1. Transformation en DataFrame
-        df = pd.DataFrame([data.features])
-        
-        # 2. Nettoyage technique
-        cols_techniques = ['SK_ID_CURR', 'TARGET', 'index', 'Unnamed: 0']
-        df_clean = df.drop(columns=[c for c in cols_techniques if c in df.columns], errors='ignore')
-
-        # 3. Alignement des colonnes (Sécurité)
-        if hasattr(model, "feature_names_in_"):
-            expected_cols = model.feature_names_in_
-            missing_cols = set(expected_cols) - set(df_clean.columns)
-            if missing_cols:
-                for c in missing_cols:
-                    df_clean[c] = 0
-            df_clean = df_clean[expected_cols]
+        # 1 à 3. Transformation, nettoyage et alignement
+        df_clean = prepare_features(data.features)
 
         # 4. Prédiction
         proba_defaut = model.predict_proba(df_clean)[:, 1][0]
         
         # 5. Seuil (Logique Métier)
-        seuil_risque = 0.067 # Arrondi pour la lisibilité
+        seuil_risque = SEUIL_RISQUE
         decision_finale = "REFUSÉ" if proba_defaut > seuil_risque else "ACCORDÉ"
         
         # --- P8 ADDITION : Calcul des SHAP Values ---
@@ -86,16 +157,8 @@ def predict_credit_score(data: ClientData):
         base_value = 0
         
         if explainer:
-            # Calcul des shap values
-            shap_values = explainer.shap_values(df_clean)
-            
-            # Gestion du format de retour de SHAP (dépend de la version et du modèle)
-            # Cas 1: SHAP renvoie une liste [valeurs_classe_0, valeurs_classe_1] -> On prend l'indice 1
-            if isinstance(shap_values, list):
-                vals = shap_values[1][0] # [1] pour la classe positive, [0] pour le 1er échantillon
-            # Cas 2: SHAP renvoie un array directement (rare pour classifier binaire mais possible)
-            else:
-                vals = shap_values[0]
+            # Calcul des shap values (même explication que la matrice de cohorte)
+            vals = compute_shap(df_clean)
             
             # On convertit en liste simple pour le JSON
             shap_data = dict(zip(df_clean.columns, vals.tolist()))
@@ -106,6 +169,16 @@ def predict_credit_score(data: ClientData):
             else:
                  base_value = float(explainer.expected_value)
 
+            # Mise à jour incrémentale des agrégats de cohorte (dossiers réels uniquement)
+            client_id = data.features.get('SK_ID_CURR')
+            if data.record_cohort and cohort_store is not None and client_id is not None:
+                cohort_store.upsert(
+                    [client_id],
+                    cohort_store.shap_row_from_dict(shap_data),
+                    [proba_defaut],
+                    cohort_store.membership_from_features(data.features)
+                )
+
         return {
             "score": float(proba_defaut),
             "decision": decision_finale,
@@ -120,5 +193,59 @@ def predict_credit_score(data: ClientData):
         traceback.print_exc() # Utile pour débugger dans la console
         raise HTTPException(status_code=400, detail=f"Erreur de traitement : {str(e)}")
 
+@app.get("/cohort/{prefix}")
+def cohort_analytics(prefix: str, top: int = 15):
+    """Agrégats SHAP par segment (ex : ORGANIZATION_TYPE_, NAME_FAMILY_STATUS_)."""
+    if cohort_store is None:
+        raise HTTPException(status_code=503, detail="Service indisponible : Matrice SHAP non chargée.")
+
+    segments = cohort_store.summary(prefix, top=top)
+    if not segments:
+        raise HTTPException(status_code=404, detail=f"Aucun segment pour le préfixe : {prefix}")
+
+    return {
+        "prefix": prefix,
+        "threshold": cohort_store.threshold,
+        "segments": segments
+    }
+
+@app.post("/counterfactual")
+def counterfactual(data: CounterfactualRequest):
+    """Plus petit changement des variables actionnables qui fait passer la décision à ACCORDÉ."""
+    if not model:
+        raise HTTPException(status_code=503, detail="Service indisponible : Modèle non chargé.")
+
+    try:
+        df_clean = prepare_features(data.features)
+
+        # Bornes : valeurs par défaut surchargées par celles de l'appelant
+        features = dict(ACTIONABLE_FEATURES)
+        for name, spec in (data.bounds or {}).items():
+            if len(spec) != 3 or not spec[2] or spec[2] <= 0:
+                raise ValueError(f"Bornes invalides pour {name} : [min, max, pas] attendu (pas > 0)")
+            if spec[0] is not None and spec[1] is not None and spec[0] > spec[1]:
+                raise ValueError(f"Bornes invalides pour {name} : min > max")
+            features[name] = tuple(spec)
+
+        # Guidage SHAP (facultatif si l'explainer n'est pas disponible)
+        shap_data = None
+        if explainer:
+            vals = compute_shap(df_clean)
+            shap_data = dict(zip(df_clean.columns, vals.tolist()))
+
+        return search_counterfactual(
+            model.predict_proba, df_clean,
+            features=features,
+            shap_values=shap_data,
+            threshold=SEUIL_RISQUE,
+            beam_width=data.beam_width,
+            budget_ms=data.budget_ms
+        )
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=400, detail=f"Erreur de traitement : {str(e)}")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
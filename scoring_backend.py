@@ -0,0 +1,76 @@
+import os
+import pandas as pd
+import requests
+
+# ==============================================================================
+# CONFIGURATION DES BACKENDS DE SCORING
+# ==============================================================================
+# "http"     : appel de l'API distante (mlflow models serve sur Render)
+# "embedded" : chargement du modèle de production dans le process (pas de requête réseau)
+
+API_URL = os.environ.get("API_URL", "https://p8-scoring-dashboard.onrender.com/invocations")
+MODEL_DIR = os.environ.get("MODEL_DIR", "model_prod")
+
+BACKENDS = ["http", "embedded"]
+BACKEND_LABELS = {"http": "API distante (HTTP)", "embedded": "Modèle embarqué"}
+
+
+def default_backend():
+    """Backend par défaut : variable d'environnement SCORING_BACKEND (lue à l'appel), sinon HTTP"""
+    backend = os.environ.get("SCORING_BACKEND", "http")
+    return backend if backend in BACKENDS else "http"
+
+# ==============================================================================
+# BACKENDS
+# ==============================================================================
+
+def load_embedded_model(model_dir=MODEL_DIR):
+    """
+    Charge le CreditScoringWrapper (Pipeline + SHAP + seuil) sauvegardé par
+    build_production_model.py : le même modèle que celui servi par l'API.
+    """
+    import mlflow.pyfunc  # Import tardif : inutile en mode HTTP
+    return mlflow.pyfunc.load_model(model_dir)
+
+
+def predict_embedded(model, records):
+    """
+    Scoring dans le process. La réponse a le même format que /invocations
+    (mlflow models serve enveloppe la sortie du wrapper dans "predictions").
+    """
+    return {"predictions": model.predict(pd.DataFrame(records))}
+
+
+def predict_http(records, url=API_URL, timeout=120):
+    """Scoring via l'API distante. Renvoie la réponse HTTP brute."""
+    payload = {"dataframe_records": records}
+    return requests.post(url, json=payload, timeout=timeout)
+
+
+# ==============================================================================
+# DÉBALLAGE DE LA RÉPONSE (COMMUN AUX DEUX BACKENDS)
+# ==============================================================================
+
+def unpack_api_result(api_result, clean_features):
+    """Déballage JSON de la réponse API -> (score, décision, seuil, shap_values)"""
+    if isinstance(api_result, dict) and "predictions" in api_result:
+        preds = api_result["predictions"]
+        data = preds[0] if isinstance(preds, list) else preds
+    elif isinstance(api_result, list):
+        data = api_result[0]
+    else:
+        data = api_result
+
+    score_raw = data.get('score', [0])
+    score = score_raw[0] if isinstance(score_raw, list) else score_raw
+    decision_raw = data.get('decision', ["Inconnu"])
+    decision = decision_raw[0] if isinstance(decision_raw, list) else decision_raw
+    threshold_raw = data.get('threshold', 0.5)
+    threshold = threshold_raw[0] if isinstance(threshold_raw, list) else threshold_raw
+    shap_values_raw = data.get('shap_values', [])
+    if shap_values_raw:
+        raw_list = shap_values_raw[0] if isinstance(shap_values_raw[0], list) else shap_values_raw
+        shap_values = dict(zip(clean_features.keys(), raw_list))
+    else:
+        shap_values = {}
+    return score, decision, threshold, shap_values
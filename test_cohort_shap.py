@@ -0,0 +1,150 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from cohort_shap import CohortShapStore, compute_shap_matrix, split_pipeline
+
+def make_data():
+    df = pd.DataFrame({
+        'SK_ID_CURR': [1, 2, 3, 4],
+        'AMT_CREDIT': [1.0, -2.0, 3.0, -4.0],
+        'EXT_SOURCE_2': [0.5, 0.5, -1.0, 1.0],
+        'NAME_FAMILY_STATUS_Married': [1, 0, 1, 0],
+        'NAME_FAMILY_STATUS_Single': [0, 1, 0, 1],
+    })
+    X = df[['AMT_CREDIT', 'EXT_SOURCE_2']]
+    scores = np.array([0.01, 0.2, 0.3, 0.05])
+    return df, X, scores
+
+# ==========================================================
+# TEST 1 : CALCUL DE LA MATRICE PAR LOTS
+# ==========================================================
+def test_compute_shap_matrix_chunks(fake_explainer):
+    """La matrice est float32, complète, et calculée en plusieurs lots."""
+    _, X, _ = make_data()
+
+    matrix = compute_shap_matrix(fake_explainer, X, chunk_size=3)
+
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (4, 2)
+    assert fake_explainer.batch_sizes == [3, 1]
+    np.testing.assert_allclose(matrix, X.to_numpy())
+
+# ==========================================================
+# TEST 2 : AGRÉGATS PAR SEGMENT
+# ==========================================================
+def test_segment_aggregates(fake_explainer):
+    """Moyenne |SHAP|, moyenne signée et taux de refus par segment."""
+    df, X, scores = make_data()
+    store = CohortShapStore.from_dataframe(df, compute_shap_matrix(fake_explainer, X), scores, X.columns)
+
+    seg = store.segments("NAME_FAMILY_STATUS_").set_index('Segment')
+    assert seg.loc['Married', 'Effectif'] == 2
+    assert seg.loc['Married', 'Taux_Refus'] == 0.5
+    assert seg.loc['Single', 'Taux_Refus'] == 0.5
+
+    profile = store.segment_profile("NAME_FAMILY_STATUS_Married").set_index('Feature')
+    assert np.isclose(profile.loc['AMT_CREDIT', 'Mean_Abs_SHAP'], 2.0)
+    assert np.isclose(profile.loc['EXT_SOURCE_2', 'Mean_SHAP'], -0.25)
+
+# ==========================================================
+# TEST 3 : MISE À JOUR INCRÉMENTALE
+# ==========================================================
+def test_incremental_upsert_matches_full_recompute(tmp_path):
+    """Ajout / remplacement de clients : mêmes agrégats qu'un recalcul complet."""
+    df, X, scores = make_data()
+    store = CohortShapStore.from_dataframe(df, X.to_numpy(), scores, X.columns)
+
+    # Remplacement du client 2 + ajout du client 5
+    store.upsert(
+        [2, 5],
+        [[10.0, 0.0], [1.0, 1.0]],
+        [0.01, 0.9],
+        [[False, True], [True, False]]
+    )
+
+    path = tmp_path / "shap_matrix.npz"
+    store.save(path)
+    reloaded = CohortShapStore.load(path)
+
+    pd.testing.assert_frame_equal(store.segments("NAME_FAMILY_STATUS_"), reloaded.segments("NAME_FAMILY_STATUS_"))
+    for seg in store.segment_names:
+        pd.testing.assert_frame_equal(store.segment_profile(seg), reloaded.segment_profile(seg), check_dtype=False)
+
+    seg = store.segments("NAME_FAMILY_STATUS_").set_index('Segment')
+    assert seg.loc['Married', 'Effectif'] == 3
+    assert seg.loc['Single', 'Taux_Refus'] == 0.0
+
+    # Le seuil est relu à l'identique (pas d'arrondi float32)
+    assert reloaded.threshold == 0.067
+
+# ==========================================================
+# TEST 4 : MISES À JOUR CONCURRENTES
+# ==========================================================
+def test_concurrent_upserts():
+    """Des upserts parallèles de nouveaux clients ne corrompent ni l'index ni les sommes."""
+    df, X, scores = make_data()
+    store = CohortShapStore.from_dataframe(df, X.to_numpy(), scores, X.columns)
+
+    def worker(offset):
+        for k in range(50):
+            store.upsert([1000 * offset + k], [[1.0, 1.0]], [0.5], [[True, False]])
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(1, 9)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store.ids) == 4 + 8 * 50
+    assert sorted(store._index.values()) == list(range(len(store.ids)))
+    seg = store.segments("NAME_FAMILY_STATUS_").set_index('Segment')
+    assert seg.loc['Married', 'Effectif'] == 2 + 8 * 50
+    profile = store.segment_profile("NAME_FAMILY_STATUS_Married").set_index('Feature')
+    expected = (np.abs(X.to_numpy()[[0, 2]]).sum(axis=0) + 400) / 402
+    np.testing.assert_allclose(profile.loc[['AMT_CREDIT', 'EXT_SOURCE_2'], 'Mean_Abs_SHAP'], expected, rtol=1e-5)
+
+# ==========================================================
+# TEST 5 : DOUBLONS DANS UN MÊME APPEL + CROISSANCE DU BUFFER
+# ==========================================================
+def test_upsert_deduplicates_and_grows(tmp_path):
+    """Un ID répété n'est compté qu'une fois (dernière occurrence) ; le buffer grandit sans perte."""
+    df, X, scores = make_data()
+    store = CohortShapStore.from_dataframe(df, X.to_numpy(), scores, X.columns)
+
+    store.upsert([9, 9], [[1.0, 1.0], [3.0, -3.0]], [0.01, 0.9], [[True, False], [True, False]])
+    assert list(store.ids) == [1, 2, 3, 4, 9]
+    seg = store.segments("NAME_FAMILY_STATUS_").set_index('Segment')
+    assert seg.loc['Married', 'Effectif'] == 3
+    np.testing.assert_allclose(store.shap[-1], [3.0, -3.0])
+    assert store.scores[-1] == np.float32(0.9)
+
+    # Nombreux ajouts : capacité doublée, données et index intacts
+    for k in range(100):
+        store.upsert([100 + k], [[float(k), 0.0]], [0.01], [[False, True]])
+    assert len(store.ids) == 105
+    assert store._index[150] == 55
+    assert store.shap[55, 0] == 50.0
+
+    path = tmp_path / "shap_matrix.npz"
+    store.save(path)
+    reloaded = CohortShapStore.load(path)
+    np.testing.assert_array_equal(reloaded.ids, store.ids)
+    pd.testing.assert_frame_equal(reloaded.segments("NAME_FAMILY_STATUS_"), store.segments("NAME_FAMILY_STATUS_"))
+
+# ==========================================================
+# TEST 6 : SÉPARATION PIPELINE / CLASSIFIEUR
+# ==========================================================
+def test_split_pipeline():
+    """Classifieur = dernière étape, préprocesseur = tout ce qui précède."""
+    class FakePipeline:
+        steps = [('scaler', 'S'), ('smote', 'R'), ('clf', 'C')]
+        def __getitem__(self, item):
+            return self.steps[item]
+
+    classifier, preprocessor = split_pipeline(FakePipeline())
+    assert classifier == 'C'
+    assert preprocessor == [('scaler', 'S'), ('smote', 'R')]
+
+    model = object()
+    assert split_pipeline(model) == (model, None)
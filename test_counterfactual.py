@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from counterfactual import search_counterfactual
+
+def make_client():
+    return pd.DataFrame([{'AMT_CREDIT': 300000.0, 'EXT_SOURCE_2': 0.2, 'DAYS_BIRTH': -12000.0}])
+
+FEATURES = {
+    'AMT_CREDIT': (0.0, None, 10000.0),
+    'EXT_SOURCE_2': (0.0, 1.0, 0.01),
+}
+
+# ==========================================================
+# TEST 1 : LA DÉCISION BASCULE VERS "ACCORDÉ"
+# ==========================================================
+def test_counterfactual_flips_decision(fake_model):
+    """La solution trouvée passe sous le seuil et ne touche qu'aux variables actionnables."""
+    result = search_counterfactual(fake_model.predict_proba, make_client(), features=FEATURES, threshold=0.067)
+
+    assert result["found"]
+    assert result["decision"] == "ACCORDÉ"
+    assert result["score"] <= 0.067 < result["initial_score"]
+    assert set(result["changes"]) <= set(FEATURES)
+
+    # Vérification : on rejoue les changements sur le modèle
+    x = make_client()
+    for f, change in result["changes"].items():
+        x[f] = change["to"]
+    assert fake_model.predict_proba(x)[:, 1][0] <= 0.067
+
+# ==========================================================
+# TEST 2 : SCORING PAR LOTS + BORNES
+# ==========================================================
+def test_counterfactual_batches_and_bounds(fake_model):
+    """Chaque itération = un seul appel predict_proba ; les bornes sont respectées."""
+    result = search_counterfactual(fake_model.predict_proba, make_client(), features=FEATURES, threshold=0.067)
+
+    # 1 appel initial + 1 par itération + 1 par passe d'élagage, chacun sur un lot
+    assert fake_model.calls == 1 + result["iterations"] + result["pruning_rounds"]
+    assert all(size > 1 for size in fake_model.batch_sizes[1:])
+    assert sum(fake_model.batch_sizes) == result["n_evaluated"]
+    for f, change in result["changes"].items():
+        lo, hi, _ = FEATURES[f]
+        assert change["to"] >= lo
+        assert hi is None or change["to"] <= hi
+
+# ==========================================================
+# TEST 3 : GUIDAGE SHAP (ET REPLI) ET CLIENT DÉJÀ ACCORDÉ
+# ==========================================================
+def test_counterfactual_shap_guidance_and_accepted_client(fake_model):
+    """Les variables à SHAP positif sont explorées d'abord ; un client accordé n'a rien à changer."""
+    result = search_counterfactual(
+        fake_model.predict_proba, make_client(), features=FEATURES,
+        shap_values={'AMT_CREDIT': -0.1, 'EXT_SOURCE_2': 0.5}, threshold=0.067
+    )
+    assert result["found"]
+    assert list(result["changes"]) == ['EXT_SOURCE_2']
+
+    # Guidage trompeur : la seule variable à SHAP positif ne suffit pas,
+    # la recherche se replie sur l'ensemble des variables actionnables
+    result = search_counterfactual(
+        fake_model.predict_proba, make_client(), features=FEATURES,
+        shap_values={'AMT_CREDIT': 0.5, 'EXT_SOURCE_2': -0.1}, threshold=0.067
+    )
+    assert result["found"]
+    assert result["score"] <= 0.067
+    assert 'EXT_SOURCE_2' in result["changes"]
+
+    accepted = make_client()
+    accepted['EXT_SOURCE_2'] = 1.0
+    result = search_counterfactual(fake_model.predict_proba, accepted, features=FEATURES, threshold=0.067)
+    assert result["found"]
+    assert result["changes"] == {}
+
+    # Modèle lent + variable guidée sans effet et sans borne : la passe guidée
+    # explore sans fin, elle ne doit pas consommer tout le budget du repli
+    fake_model.delay = 0.02
+    client = make_client()
+    client['AMT_ANNUITY'] = 20000.0
+    result = search_counterfactual(
+        fake_model.predict_proba, client,
+        features=dict(FEATURES, AMT_ANNUITY=(None, None, 500.0)),
+        shap_values={'AMT_ANNUITY': 0.5, 'AMT_CREDIT': -0.1, 'EXT_SOURCE_2': -0.1},
+        threshold=0.067, budget_ms=1000
+    )
+    assert result["found"]
+    assert result["elapsed_ms"] < 1500
+
+# ==========================================================
+# TEST 4 : VALEURS BLOQUÉES À UNE BORNE
+# ==========================================================
+def test_counterfactual_values_rescored_at_bounds():
+    """
+    Départ à un nombre non entier de pas de la borne : la valeur renvoyée est
+    exactement celle qui a été scorée (re-scorer la solution donne ACCORDÉ).
+    """
+    def approve_at_top(X):
+        p = np.where(X['EXT_SOURCE_2'].to_numpy() >= 0.999, 0.05, 0.2)
+        return np.column_stack([1 - p, p])
+
+    def approve_without_credit(X):
+        p = np.where(X['AMT_CREDIT'].to_numpy() <= 0.0, 0.05, 0.2)
+        return np.column_stack([1 - p, p])
+
+    cases = [
+        (approve_at_top, {'EXT_SOURCE_2': 0.7866}, {'EXT_SOURCE_2': (0.0, 1.0, 0.01)}),
+        (approve_without_credit, {'AMT_CREDIT': 312500.0}, {'AMT_CREDIT': (0.0, None, 5000.0)}),
+    ]
+    for predict_proba, values, features in cases:
+        x = pd.DataFrame([values])
+        result = search_counterfactual(predict_proba, x, features=features, threshold=0.067)
+        assert result["found"]
+
+        for f, change in result["changes"].items():
+            x[f] = change["to"]
+        rescored = predict_proba(x)[:, 1][0]
+        assert rescored == result["score"]
+        assert rescored <= 0.067
@@ -61,4 +61,84 @@ def test_data_loading():
         options = at.sidebar.selectbox[0].options
         assert len(options) > 1 
     except IndexError:
-        assert False, "La selectbox des clients est introuvable."
\ No newline at end of file
+        assert False, "La selectbox des clients est introuvable."
+
+# ==========================================================
+# TEST 5 : MODE EMBARQUÉ (HORS-LIGNE, SANS REQUÊTE HTTP)
+# ==========================================================
+def setup_offline(monkeypatch, tmp_path, backend, wrapper):
+    """Données d'exemple locales, modèle embarqué factice et réseau interdit"""
+    import pandas as pd
+    import streamlit as st
+    import scoring_backend
+
+    pd.DataFrame({
+        'SK_ID_CURR': [100001, 100002],
+        'AMT_INCOME_TOTAL': [100000.0, 200000.0],
+        'AMT_CREDIT': [300000.0, 400000.0],
+        'AMT_ANNUITY': [20000.0, 30000.0],
+        'DAYS_BIRTH': [-12000.0, -15000.0],
+        'EXT_SOURCE_2': [0.5, 0.6],
+        'EXT_SOURCE_3': [0.4, 0.3],
+    }).to_csv(tmp_path / "donnees_sample.csv", index=False)
+    monkeypatch.chdir(tmp_path)
+
+    monkeypatch.setenv("SCORING_BACKEND", backend)
+    monkeypatch.setattr(scoring_backend, "load_embedded_model", lambda *args, **kwargs: wrapper)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("Appel HTTP inattendu")
+    monkeypatch.setattr(scoring_backend.requests, "post", no_network)
+
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+def test_embedded_backend_offline(monkeypatch, tmp_path, fake_wrapper):
+    """
+    Avec SCORING_BACKEND=embedded, la sélection d'un dossier est scorée
+    dans le process (modèle chargé une fois), sans aucune requête réseau.
+    """
+    setup_offline(monkeypatch, tmp_path, "embedded", fake_wrapper)
+
+    at = AppTest.from_file("dashboard.py").run()
+    assert not at.exception
+    assert at.sidebar.radio[0].value == "embedded"
+
+    at.sidebar.selectbox[0].set_value(100001).run()
+    assert not at.exception
+    assert fake_wrapper.calls == 1
+    assert at.session_state.api_data["backend"] == "embedded"
+    assert "Scoring (embedded)" in at.session_state.render_times
+    assert any("REFUSÉ" in md.value for md in at.markdown)
+
+def test_backend_switch_rescores(monkeypatch, tmp_path, fake_wrapper):
+    """Changer de backend rescore le dossier affiché avec le nouveau backend."""
+    setup_offline(monkeypatch, tmp_path, "http", fake_wrapper)
+
+    at = AppTest.from_file("dashboard.py").run()
+    at.session_state.api_data = {"predictions": {"score": [0.01], "decision": ["ACCORDÉ"], "threshold": 0.067},
+                                 "clean_features": {"AMT_CREDIT": 1.0}, "backend": "http"}
+    at.session_state.current_client_id = 100001
+    at.sidebar.radio[0].set_value("embedded").run()
+
+    assert not at.exception
+    assert fake_wrapper.calls == 1
+    assert at.session_state.api_data["backend"] == "embedded"
+
+# ==========================================================
+# TEST 6 : MODE DEBUG (TEMPS DE RENDU DANS CHAQUE SECTION)
+# ==========================================================
+def test_debug_mode_section_timings(monkeypatch, tmp_path, fake_wrapper):
+    """En mode debug, chaque section affiche son propre temps de rendu."""
+    setup_offline(monkeypatch, tmp_path, "embedded", fake_wrapper)
+
+    at = AppTest.from_file("dashboard.py").run()
+    at.sidebar.selectbox[0].set_value(100001).run()
+    assert not any("🐞" in c.value for c in at.caption)
+
+    at.sidebar.checkbox(key="debug_mode").check().run()
+    assert not at.exception
+    debug_captions = [c.value for c in at.caption if c.value.startswith("🐞")]
+    for section in ["0. Fiche client", "1. Synthèse", "2. Interprétabilité", "3. Uni-variée", "4. Bi-variée", "5. Cohorte"]:
+        assert any(section in c for c in debug_captions), section
+    assert any("Scoring (embedded)" in c for c in debug_captions)
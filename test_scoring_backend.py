@@ -0,0 +1,58 @@
+import json
+import pandas as pd
+import scoring_backend
+from scoring_backend import predict_embedded, predict_http, unpack_api_result
+
+# ==========================================================
+# TEST 1 : MODE EMBARQUÉ = MÊME FORMAT QUE /invocations
+# ==========================================================
+def test_embedded_response_shape(fake_wrapper):
+    """La réponse embarquée est enveloppée dans 'predictions', comme mlflow models serve."""
+    result = predict_embedded(fake_wrapper, [{"AMT_CREDIT": 1.0, "EXT_SOURCE_2": 0.5}])
+
+    assert set(result) == {"predictions"}
+    preds = result["predictions"]
+    assert preds["decision"] == ["REFUSÉ"]
+    assert preds["threshold"] == 0.067
+    assert len(preds["shap_values"][0]) == 2
+
+# ==========================================================
+# TEST 2 : MODE HTTP = MÊME PAYLOAD QU'AVANT
+# ==========================================================
+def test_http_payload(monkeypatch):
+    """Le mode HTTP envoie toujours le format 'dataframe_records' à l'URL configurée."""
+    sent = {}
+
+    def fake_post(url, json, timeout):
+        sent.update(url=url, json=json)
+        return "response"
+
+    monkeypatch.setattr(scoring_backend.requests, "post", fake_post)
+    assert predict_http([{"AMT_CREDIT": 1.0}], url="http://localhost:10000/invocations") == "response"
+    assert sent["url"] == "http://localhost:10000/invocations"
+    assert sent["json"] == {"dataframe_records": [{"AMT_CREDIT": 1.0}]}
+
+# ==========================================================
+# TEST 3 : MÊME RÉSULTAT DÉBALLÉ DANS LES DEUX MODES
+# ==========================================================
+def test_backends_unpack_identically(monkeypatch, fake_wrapper):
+    """
+    La réponse HTTP (sortie du wrapper sérialisée en JSON par mlflow serve)
+    et la réponse embarquée donnent le même (score, décision, seuil, shap).
+    """
+    wrapper = fake_wrapper
+    features = {"AMT_CREDIT": 1.0, "EXT_SOURCE_2": 0.5}
+
+    class FakeResponse:
+        status_code = 200
+        def json(self):
+            # Aller-retour JSON, comme derrière /invocations
+            return json.loads(json.dumps({"predictions": wrapper.predict(pd.DataFrame([features]))}))
+
+    monkeypatch.setattr(scoring_backend.requests, "post", lambda url, json, timeout: FakeResponse())
+
+    http_result = predict_http([features]).json()
+    embedded_result = predict_embedded(wrapper, [features])
+
+    assert unpack_api_result(http_result, features) == unpack_api_result(embedded_result, features)
+    assert unpack_api_result(embedded_result, features) == (0.2, "REFUSÉ", 0.067, {"AMT_CREDIT": 0.01, "EXT_SOURCE_2": 0.01})